@@ -1,23 +1,198 @@
 import datetime
+import os
+import tempfile
+import uuid
+from collections import defaultdict
+from collections.abc import Callable, Iterable
 from dataclasses import dataclass, field
 from pathlib import Path
 
+from src.analysis.similarity import find_similar_pairs
 from src.models.base import AssetBase
+from src.models.sources import read_location
 from src.utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
+# os.umask can only be read by setting it, so do that once at import, before any threads run
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+REPORT_HEAD = """<style>
+        body {
+            font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, sans-serif;
+            margin: 2rem;
+            color: #333;
+            background-color: #f8f9fa;
+        }
+        h1, h2 { color: #2c3e50; }
+        .card {
+            background: white; padding: 1.5rem; border-radius: 8px;
+            border: 1px solid #ddd; margin-bottom: 2rem;
+            box-shadow: 0 2px 4px rgba(0,0,0,0.05);
+        }
+        .metadata p { margin: 0.5rem 0; }
+        .summary { display: flex; gap: 2rem; margin-bottom: 2rem; }
+        .stat-card {
+            background: #fff;
+            padding: 1.5rem;
+            border: 1px solid #ddd;
+            border-radius: 8px;
+            min-width: 150px;
+            text-align: center;
+            flex: 1;
+        }
+        .stat-val { font-size: 2rem; font-weight: bold; }
+        .added { color: #28a745; }
+        .removed { color: #dc3545; }
+        .modified { color: #ffc107; }
+        .moved { color: #17a2b8; }
+        table { width: 100%; border-collapse: collapse; margin-top: 1rem; }
+        th, td { text-align: left; padding: 12px; border-bottom: 1px solid #eee; }
+        th { background-color: #f1f1f1; font-weight: bold; }
+        tr:hover { background-color: #fafafa; }
+        .tag {
+            padding: 4px 8px; border-radius: 12px; font-size: 0.85em;
+            color: white; display: inline-block;
+        }
+        .tag.bg-added { background-color: #28a745; }
+        .tag.bg-removed { background-color: #dc3545; }
+        .tag.bg-modified { background-color: #ffc107; }
+        .tag.bg-moved { background-color: #17a2b8; }
+        .tag.bg-drift { background-color: #dc3545; }
+        .tag.bg-partial { background-color: #ffc107; }
+        .tag.bg-variant { color: #333; font-family: monospace; }
+        .missing { color: #aaa; }
+
+        /* Floating TOC */
+        .toc-container {
+            position: fixed;
+            right: 20px;
+            top: 20px;
+            z-index: 1000;
+        }
+        .toc-button {
+            background: #2c3e50;
+            color: white;
+            padding: 10px 15px;
+            border-radius: 5px;
+            cursor: pointer;
+            box-shadow: 0 2px 5px rgba(0,0,0,0.2);
+            font-weight: bold;
+            display: flex;
+            align-items: center;
+            gap: 10px;
+        }
+        .toc-content {
+            display: none;
+            position: absolute;
+            right: 0;
+            top: 100%;
+            background: white;
+            border: 1px solid #ddd;
+            border-radius: 5px;
+            box-shadow: 0 5px 15px rgba(0,0,0,0.1);
+            width: 250px;
+            margin-top: 10px;
+            padding: 10px 0;
+            max-height: 80vh;
+            overflow-y: auto;
+        }
+        .toc-container:hover .toc-content { display: block; }
+        .toc-content a {
+            display: block;
+            padding: 8px 15px;
+            color: #333;
+            text-decoration: none;
+            border-bottom: 1px solid #eee;
+        }
+        .toc-content a:hover { background: #f8f9fa; color: #007bff; }
+    </style>
+    <script>
+    document.addEventListener('DOMContentLoaded', function() {
+        const tocContent = document.getElementById('toc-links');
+        const headers = document.querySelectorAll('h1, h2');
+        headers.forEach((header, index) => {
+            if (!header.id) {
+                header.id = 'section-' + index;
+            }
+            const link = document.createElement('a');
+            link.href = '#' + header.id;
+            link.textContent = header.textContent;
+            link.style.paddingLeft = header.tagName === 'H2' ? '25px' : '15px';
+            tocContent.appendChild(link);
+        });
+    });
+    </script>
+    """
+
+REPORT_TOC = """<div class="toc-container">
+        <div class="toc-button">
+            <span>&equiv; Table of Contents</span>
+        </div>
+        <div class="toc-content" id="toc-links"></div>
+    </div>
+    """
+
 
 @dataclass
 class ComparisonResult:
     added: list[AssetBase] = field(default_factory=list)
     removed: list[AssetBase] = field(default_factory=list)
     modified: list[tuple[AssetBase, AssetBase]] = field(default_factory=list)
+    moved: list[tuple[AssetBase, AssetBase, float]] = field(default_factory=list)
+
+
+@dataclass
+class DriftMatrix:
+    sources: list[str]
+    # asset_id -> digest per source (None when the asset is absent from that source)
+    rows: dict[str, list[str | None]] = field(default_factory=dict)
+    assets: dict[str, AssetBase] = field(default_factory=dict)
+
+    def __post_init__(self):
+        if len(set(self.sources)) != len(self.sources):
+            raise ValueError(f"Duplicate source labels: {self.sources}")
+
+    def add_source(self, label: str, assets: Iterable[AssetBase]) -> None:
+        """Fold one source's assets into its column, consuming them as they stream in."""
+        col = self.sources.index(label)
+        for asset in assets:
+            row = self.rows.get(asset.asset_id)
+            if row is None:
+                row = self.rows[asset.asset_id] = [None] * len(self.sources)
+                self.assets[asset.asset_id] = asset
+            row[col] = asset.sha256
+
+    def status(self, asset_id: str) -> str:
+        """Classify an asset as In Sync, Partial (missing somewhere) or Drift."""
+        digests = self.rows[asset_id]
+        if len({d for d in digests if d is not None}) > 1:
+            return "Drift"
+        if None in digests:
+            return "Partial"
+        return "In Sync"
+
+
+VARIANT_COLORS = ["#d4edda", "#f8d7da", "#fff3cd", "#d1ecf1", "#e2d9f3", "#fde2cf"]
 
 
 class CodeComparator:
     """Core comparison logic and HTML report generation."""
 
+    def __init__(
+        self,
+        move_threshold: float = 0.8,
+        base_reader: Callable[[str], bytes] = read_location,
+        report_dir: Path = Path("app/reports"),
+    ):
+        # Minimum similarity for an edited asset to be reported as Moved/Renamed.
+        # A threshold above 1.0 disables move detection entirely.
+        self.move_threshold = move_threshold
+        # Reads base-side content when it is no longer on disk (e.g. a re-used git checkout)
+        self.base_reader = base_reader
+        self.report_dir = report_dir
+
     def compare_assets(
         self, base_assets: list[AssetBase], head_assets: list[AssetBase]
     ) -> ComparisonResult:
@@ -38,16 +213,100 @@ class CodeComparator:
             if asset_id not in head_map:
                 result.removed.append(base_asset)
 
+        if self.move_threshold <= 1.0:
+            self.detect_moves(result)
+
         return result
 
+    def compare_sorted(
+        self, base_assets: Iterable[AssetBase], head_assets: Iterable[AssetBase]
+    ) -> ComparisonResult:
+        """Compare two streams of assets that are already sorted by asset_id.
+
+        Walks both sides in a single merge pass, so only the differences are held in
+        memory. Used with AssetStore in low-memory mode.
+        """
+        result = ComparisonResult()
+        base_iter, head_iter = iter(base_assets), iter(head_assets)
+        base_asset, head_asset = next(base_iter, None), next(head_iter, None)
+
+        while base_asset is not None or head_asset is not None:
+            if head_asset is None or (
+                base_asset is not None and base_asset.asset_id < head_asset.asset_id
+            ):
+                result.removed.append(base_asset)
+                base_asset = next(base_iter, None)
+            elif base_asset is None or head_asset.asset_id < base_asset.asset_id:
+                result.added.append(head_asset)
+                head_asset = next(head_iter, None)
+            else:
+                if head_asset.sha256 != base_asset.sha256:
+                    result.modified.append((base_asset, head_asset))
+                base_asset, head_asset = next(base_iter, None), next(head_iter, None)
+
+        if self.move_threshold <= 1.0:
+            self.detect_moves(result)
+
+        return result
+
+    def detect_moves(self, result: ComparisonResult) -> None:
+        """Pair Removed and Added assets that are the same asset under a new name."""
+        # Exact moves: identical digest on both sides
+        removed_by_digest = defaultdict(list)
+        for a in result.removed:
+            if a.sha256:
+                removed_by_digest[(a.asset_type, a.sha256)].append(a)
+
+        matched_ids = set()
+        remaining_added = []
+        for head_asset in result.added:
+            candidates = removed_by_digest.get((head_asset.asset_type, head_asset.sha256))
+            if candidates:
+                base_asset = candidates.pop(0)
+                matched_ids.add(base_asset.asset_id)
+                result.moved.append((base_asset, head_asset, 1.0))
+            else:
+                remaining_added.append(head_asset)
+        remaining_removed = [a for a in result.removed if a.asset_id not in matched_ids]
+
+        # Edited moves: similar content
+        for base_asset, head_asset, score in find_similar_pairs(
+            remaining_removed, remaining_added, self.move_threshold, self.base_reader
+        ):
+            matched_ids.add(base_asset.asset_id)
+            matched_ids.add(head_asset.asset_id)
+            result.moved.append((base_asset, head_asset, score))
+
+        result.removed = [a for a in result.removed if a.asset_id not in matched_ids]
+        result.added = [a for a in remaining_added if a.asset_id not in matched_ids]
+        if result.moved:
+            logger.info(f"Detected {len(result.moved)} moved/renamed assets")
+
+    def _report_path(self, prefix: str, repo_name: str) -> Path:
+        file_timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.report_dir.mkdir(parents=True, exist_ok=True)
+        # The random suffix keeps parallel runs on the same repo from clobbering each other
+        unique = uuid.uuid4().hex[:8]
+        return self.report_dir / f"{prefix}_{file_timestamp}_{repo_name}_{unique}.html"
+
+    def _write_report(self, report_file: Path, html: str) -> None:
+        """Write the report atomically so readers never see a partial file."""
+        fd, tmp_path = tempfile.mkstemp(dir=report_file.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(html)
+            # mkstemp creates owner-only files; give the report the permissions open() would
+            os.chmod(tmp_path, 0o666 & ~_UMASK)
+            os.replace(tmp_path, report_file)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
     def generate_html_report(
         self, result: ComparisonResult, info: dict, commits: list[dict] = None
     ) -> Path:
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        file_timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M")
-        report_dir = Path("app/reports")
-        report_dir.mkdir(parents=True, exist_ok=True)
-        report_file = report_dir / f"compare_{file_timestamp}_{info['repo_name']}.html"
+        report_file = self._report_path("compare", info["repo_name"])
 
         commits_html = ""
         if commits:
@@ -94,114 +353,10 @@ class CodeComparator:
 <html>
 <head>
     <title>Branch Compare: {info['repo_name']}</title>
-    <style>
-        body {{
-            font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, sans-serif;
-            margin: 2rem;
-            color: #333;
-            background-color: #f8f9fa;
-        }}
-        h1, h2 {{ color: #2c3e50; }}
-        .card {{
-            background: white; padding: 1.5rem; border-radius: 8px;
-            border: 1px solid #ddd; margin-bottom: 2rem;
-            box-shadow: 0 2px 4px rgba(0,0,0,0.05);
-        }}
-        .metadata p {{ margin: 0.5rem 0; }}
-        .summary {{ display: flex; gap: 2rem; margin-bottom: 2rem; }}
-        .stat-card {{
-            background: #fff;
-            padding: 1.5rem;
-            border: 1px solid #ddd;
-            border-radius: 8px;
-            min-width: 150px;
-            text-align: center;
-            flex: 1;
-        }}
-        .stat-val {{ font-size: 2rem; font-weight: bold; }}
-        .added {{ color: #28a745; }}
-        .removed {{ color: #dc3545; }}
-        .modified {{ color: #ffc107; }}
-        table {{ width: 100%; border-collapse: collapse; margin-top: 1rem; }}
-        th, td {{ text-align: left; padding: 12px; border-bottom: 1px solid #eee; }}
-        th {{ background-color: #f1f1f1; font-weight: bold; }}
-        tr:hover {{ background-color: #fafafa; }}
-        .tag {{
-            padding: 4px 8px; border-radius: 12px; font-size: 0.85em;
-            color: white; display: inline-block;
-        }}
-        .tag.bg-added {{ background-color: #28a745; }}
-        .tag.bg-removed {{ background-color: #dc3545; }}
-        .tag.bg-modified {{ background-color: #ffc107; }}
-
-        /* Floating TOC */
-        .toc-container {{
-            position: fixed;
-            right: 20px;
-            top: 20px;
-            z-index: 1000;
-        }}
-        .toc-button {{
-            background: #2c3e50;
-            color: white;
-            padding: 10px 15px;
-            border-radius: 5px;
-            cursor: pointer;
-            box-shadow: 0 2px 5px rgba(0,0,0,0.2);
-            font-weight: bold;
-            display: flex;
-            align-items: center;
-            gap: 10px;
-        }}
-        .toc-content {{
-            display: none;
-            position: absolute;
-            right: 0;
-            top: 100%;
-            background: white;
-            border: 1px solid #ddd;
-            border-radius: 5px;
-            box-shadow: 0 5px 15px rgba(0,0,0,0.1);
-            width: 250px;
-            margin-top: 10px;
-            padding: 10px 0;
-            max-height: 80vh;
-            overflow-y: auto;
-        }}
-        .toc-container:hover .toc-content {{ display: block; }}
-        .toc-content a {{
-            display: block;
-            padding: 8px 15px;
-            color: #333;
-            text-decoration: none;
-            border-bottom: 1px solid #eee;
-        }}
-        .toc-content a:hover {{ background: #f8f9fa; color: #007bff; }}
-    </style>
-    <script>
-    document.addEventListener('DOMContentLoaded', function() {{
-        const tocContent = document.getElementById('toc-links');
-        const headers = document.querySelectorAll('h1, h2');
-        headers.forEach((header, index) => {{
-            if (!header.id) {{
-                header.id = 'section-' + index;
-            }}
-            const link = document.createElement('a');
-            link.href = '#' + header.id;
-            link.textContent = header.textContent;
-            link.style.paddingLeft = header.tagName === 'H2' ? '25px' : '15px';
-            tocContent.appendChild(link);
-        }});
-    }});
-    </script>
+    {REPORT_HEAD}
 </head>
 <body>
-    <div class="toc-container">
-        <div class="toc-button">
-            <span>&equiv; Table of Contents</span>
-        </div>
-        <div class="toc-content" id="toc-links"></div>
-    </div>
+    {REPORT_TOC}
 
     <h1>Code Comparison Report</h1>
 
@@ -241,6 +396,10 @@ class CodeComparator:
             <div class="stat-val modified">{len(result.modified)}</div>
             <div>Modified Assets</div>
         </div>
+        <div class="stat-card">
+            <div class="stat-val moved">{len(result.moved)}</div>
+            <div>Moved/Renamed Assets</div>
+        </div>
     </div>
 
     <div class="card">
@@ -270,6 +429,12 @@ class CodeComparator:
                 f"<tr><td><span class='tag bg-modified'>Modified</span></td>"
                 f"<td>{b.asset_type}</td><td>{b.name}</td></tr>"
             )
+        for b, h, score in result.moved:
+            html += (
+                f"<tr><td><span class='tag bg-moved'>Moved/Renamed</span></td>"
+                f"<td>{b.asset_type}</td>"
+                f"<td>{b.name} &rarr; {h.name} ({score:.0%} similar)</td></tr>"
+            )
 
         html += """
             </tbody>
@@ -278,5 +443,99 @@ class CodeComparator:
 </body>
 </html>
         """
-        report_file.write_text(html)
+        self._write_report(report_file, html)
+        return report_file
+
+    def generate_drift_report(self, matrix: DriftMatrix, info: dict) -> Path:
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        report_file = self._report_path("drift", info["repo_name"])
+
+        counts = {"In Sync": 0, "Partial": 0, "Drift": 0}
+        rows_html = ""
+        for asset_id in sorted(matrix.rows):
+            status = matrix.status(asset_id)
+            counts[status] += 1
+            if status == "In Sync":
+                continue
+
+            # Label each distinct digest A, B, C... in order of first appearance
+            variants: dict[str, str] = {}
+            cells = ""
+            for digest in matrix.rows[asset_id]:
+                if digest is None:
+                    cells += "<td class='missing'>&mdash;</td>"
+                    continue
+                if digest not in variants:
+                    variants[digest] = chr(ord("A") + len(variants) % 26)
+                color = VARIANT_COLORS[(ord(variants[digest]) - ord("A")) % len(VARIANT_COLORS)]
+                cells += (
+                    f"<td><span class='tag bg-variant' style='background-color: {color};' "
+                    f"title='{digest}'>{variants[digest]} {digest[:8]}</span></td>"
+                )
+
+            asset = matrix.assets[asset_id]
+            tag = "bg-drift" if status == "Drift" else "bg-partial"
+            rows_html += (
+                f"<tr><td><span class='tag {tag}'>{status}</span></td>"
+                f"<td>{asset.asset_type}</td><td>{asset.name}</td>{cells}</tr>"
+            )
+
+        source_headers = "".join(f"<th>{label}</th>" for label in matrix.sources)
+        source_list = "".join(
+            f"<p><strong>{label}:</strong> {info.get('source_details', {}).get(label, label)}</p>"
+            for label in matrix.sources
+        )
+
+        html = f"""
+<!DOCTYPE html>
+<html>
+<head>
+    <title>Environment Drift: {info['repo_name']}</title>
+    {REPORT_HEAD}
+</head>
+<body>
+    {REPORT_TOC}
+
+    <h1>Environment Drift Report</h1>
+
+    <div class="card metadata">
+        <p><strong>Scenario:</strong> {info.get('scenario', 'Multi-way Drift')}</p>
+        {source_list}
+        <p><strong>Date:</strong> {timestamp}</p>
+    </div>
+
+    <div class="summary">
+        <div class="stat-card">
+            <div class="stat-val added">{counts['In Sync']}</div>
+            <div>In Sync</div>
+        </div>
+        <div class="stat-card">
+            <div class="stat-val modified">{counts['Partial']}</div>
+            <div>Missing in Some</div>
+        </div>
+        <div class="stat-card">
+            <div class="stat-val removed">{counts['Drift']}</div>
+            <div>Drifted</div>
+        </div>
+    </div>
+
+    <div class="card">
+        <h2>Drift Matrix</h2>
+        <p>
+            Only assets that differ between sources are listed. Cells sharing a letter have
+            identical content; &mdash; means the asset is absent from that source.
+        </p>
+        <table>
+            <thead>
+                <tr><th>Status</th><th>Type</th><th>Name</th>{source_headers}</tr>
+            </thead>
+            <tbody>
+                {rows_html}
+            </tbody>
+        </table>
+    </div>
+</body>
+</html>
+        """
+        self._write_report(report_file, html)
         return report_file
@@ -0,0 +1,127 @@
+import hashlib
+import re
+from collections import defaultdict
+from collections.abc import Callable, Iterable
+
+from src.models.base import AssetBase
+from src.models.sources import read_location
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+
+_BIN_BITS = (NUM_PERM - 1).bit_length()
+_MAX_HASH = (1 << (64 - _BIN_BITS)) - 1
+_TOKEN_RE = re.compile(r"[A-Za-z0-9_.:$-]+")
+
+
+def tokenize(text: str) -> set[str]:
+    """Split text into overlapping word shingles."""
+    words = _TOKEN_RE.findall(text)
+    if len(words) < SHINGLE_SIZE:
+        return set(words)
+    return {" ".join(words[i : i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def read_asset_tokens(asset: AssetBase, read: Callable[[str], bytes] = read_location) -> set[str]:
+    """Read the comparable content of an asset from its source as a token set."""
+    services = getattr(asset, "services", None)
+    if services is not None:
+        # Packages are compared by the services they contain
+        return {f"{s.name}@{s.sha256}" for s in services}
+
+    location = asset.f_path
+    if asset.asset_type == "flow_service":
+        location = f"{location}/flow.xml"
+    try:
+        return tokenize(read(location).decode(errors="ignore"))
+    except OSError:
+        return set()
+
+
+def minhash(tokens: Iterable[str]) -> tuple[int, ...]:
+    """Compute a one-permutation MinHash signature for a token set.
+
+    Each token is hashed once: the low bits pick one of NUM_PERM bins and the rest is
+    the value kept if it is the bin's minimum. Empty bins borrow from the next filled
+    bin to their right, offset by the distance, so signatures stay aligned for banding.
+    """
+    bins = [-1] * NUM_PERM
+    for token in tokens:
+        value = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "big")
+        i = value & (NUM_PERM - 1)
+        value >>= _BIN_BITS
+        if bins[i] < 0 or value < bins[i]:
+            bins[i] = value
+    if all(v < 0 for v in bins):
+        return (_MAX_HASH,) * NUM_PERM
+
+    signature = []
+    for i in range(NUM_PERM):
+        distance = 0
+        while bins[(i + distance) % NUM_PERM] < 0:
+            distance += 1
+        signature.append(bins[(i + distance) % NUM_PERM] + distance * (_MAX_HASH + 1))
+    return tuple(signature)
+
+
+def estimate_similarity(sig_a: tuple[int, ...], sig_b: tuple[int, ...]) -> float:
+    """Estimate Jaccard similarity from two MinHash signatures."""
+    return sum(1 for x, y in zip(sig_a, sig_b, strict=True) if x == y) / NUM_PERM
+
+
+def find_similar_pairs(
+    removed: list[AssetBase],
+    added: list[AssetBase],
+    threshold: float,
+    base_reader: Callable[[str], bytes] = read_location,
+    head_reader: Callable[[str], bytes] = read_location,
+) -> list[tuple[AssetBase, AssetBase, float]]:
+    """Pair removed and added assets whose content is similar.
+
+    Candidates are found with MinHash LSH banding, so only assets sharing at least
+    one band bucket are scored. Each asset is used in at most one pair, best first.
+    The readers return file content for an asset location on each side.
+    """
+    signatures: dict[int, tuple[int, ...]] = {}
+    buckets: dict[tuple, list[int]] = defaultdict(list)
+
+    # Read in location order so archive-backed sources are mostly read front to back
+    for idx in sorted(range(len(removed)), key=lambda i: removed[i].f_path):
+        asset = removed[idx]
+        tokens = read_asset_tokens(asset, base_reader)
+        if not tokens:
+            continue
+        sig = minhash(tokens)
+        signatures[idx] = sig
+        for band in range(BANDS):
+            key = (asset.asset_type, band, sig[band * ROWS : (band + 1) * ROWS])
+            buckets[key].append(idx)
+
+    scored = []
+    for head_idx in sorted(range(len(added)), key=lambda i: added[i].f_path):
+        asset = added[head_idx]
+        tokens = read_asset_tokens(asset, head_reader)
+        if not tokens:
+            continue
+        sig = minhash(tokens)
+        candidates = set()
+        for band in range(BANDS):
+            key = (asset.asset_type, band, sig[band * ROWS : (band + 1) * ROWS])
+            candidates.update(buckets.get(key, ()))
+        for base_idx in candidates:
+            score = estimate_similarity(signatures[base_idx], sig)
+            if score >= threshold:
+                scored.append((score, base_idx, head_idx))
+
+    pairs = []
+    used_base: set[int] = set()
+    used_head: set[int] = set()
+    for score, base_idx, head_idx in sorted(scored, key=lambda s: (-s[0], s[1], s[2])):
+        if base_idx in used_base or head_idx in used_head:
+            continue
+        used_base.add(base_idx)
+        used_head.add(head_idx)
+        pairs.append((removed[base_idx], added[head_idx], score))
+    return pairs
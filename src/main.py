@@ -1,10 +1,21 @@
 import argparse
+import os
 import sys
+from collections.abc import Iterable
+from itertools import chain
 from pathlib import Path
 
-from src.analysis.comparer import CodeComparator
-from src.models.assets.webmethods import discover_all_assets, flatten_assets
+from src.analysis.comparer import CodeComparator, ComparisonResult, DriftMatrix
+from src.models.asset_store import AssetStore
+from src.models.assets.webmethods import (
+    iter_assets,
+    iter_flattened,
+    iter_packages,
+    iter_properties,
+)
+from src.models.base import AssetBase
 from src.models.git_repo import GitRepo
+from src.models.sources import is_archive
 from src.utils.logger import setup_logger
 
 logger = setup_logger("ibm_wbm_code_compare")
@@ -23,7 +34,35 @@ def get_input(prompt: str, default: str | None = None) -> str:
         print("Input required.")
 
 
-def run_branch_vs_branch(repo_url: str, base_branch: str, head_branch: str, workdir: str):
+def collect_assets(
+    assets: Iterable[AssetBase], memory_cap_mb: int | None
+) -> list[AssetBase] | AssetStore:
+    """Materialize scanned assets, spilling them to disk when a memory cap is set."""
+    if memory_cap_mb is None:
+        return list(assets)
+    # Base and head stores are both alive during the comparison, so each gets half the cap
+    return AssetStore(memory_cap_mb * 1024 * 1024 // 2).extend(assets)
+
+
+def compare_collected(
+    comparator: CodeComparator,
+    base_assets: list[AssetBase] | AssetStore,
+    head_assets: list[AssetBase] | AssetStore,
+) -> ComparisonResult:
+    if isinstance(base_assets, AssetStore):
+        return comparator.compare_sorted(base_assets, head_assets)
+    return comparator.compare_assets(base_assets, head_assets)
+
+
+def run_branch_vs_branch(
+    repo_url: str,
+    base_branch: str,
+    head_branch: str,
+    workdir: str,
+    move_threshold: float = 0.8,
+    memory_cap_mb: int | None = None,
+    report_dir: str = "app/reports",
+):
     repo_name = repo_url.split("/")[-1].replace(".git", "")
     local_path = Path(workdir) / repo_name
     repo = GitRepo(remote_url=repo_url, local_path=local_path)
@@ -37,18 +76,24 @@ def run_branch_vs_branch(repo_url: str, base_branch: str, head_branch: str, work
         logger.error(f"Failed to checkout base: {base_branch}")
         return
     logger.info(f"Scanning base branch: {base_branch}")
-    base_assets = flatten_assets(discover_all_assets(local_path))
+    base_assets = collect_assets(iter_assets(local_path), memory_cap_mb)
 
     # 2. Head Assets
     if not repo.checkout(head_branch):
         logger.error(f"Failed to checkout head: {head_branch}")
         return
     logger.info(f"Scanning head branch: {head_branch}")
-    head_assets = flatten_assets(discover_all_assets(local_path))
+    head_assets = collect_assets(iter_assets(local_path), memory_cap_mb)
 
     # 3. Compare & Report
-    comparator = CodeComparator()
-    result = comparator.compare_assets(base_assets, head_assets)
+    # Head is checked out now, so base-side content for move detection comes from git
+    with repo.blob_reader(base_branch) as base_reader:
+        comparator = CodeComparator(
+            move_threshold=move_threshold,
+            base_reader=base_reader.read,
+            report_dir=Path(report_dir),
+        )
+        result = compare_collected(comparator, base_assets, head_assets)
     commits = repo.get_commit_log(base_branch, head_branch)
 
     info = {
@@ -70,6 +115,9 @@ def run_branch_vs_local(
     local_packages: str | None,
     local_properties: str | None,
     workdir: str,
+    move_threshold: float = 0.8,
+    memory_cap_mb: int | None = None,
+    report_dir: str = "app/reports",
 ):
     repo_name = repo_url.split("/")[-1].replace(".git", "")
     repo_local_path = Path(workdir) / repo_name
@@ -84,26 +132,22 @@ def run_branch_vs_local(
         logger.error(f"Failed to checkout branch: {branch}")
         return
     logger.info(f"Scanning repo branch: {branch}")
-    repo_assets = flatten_assets(discover_all_assets(repo_local_path))
+    repo_assets = collect_assets(iter_assets(repo_local_path), memory_cap_mb)
 
     # 2. Local Assets (Target)
-    logger.info("Scanning local folders...")
+    logger.info("Scanning local folders/archives...")
     local_assets = []
     if local_packages:
-        from src.models.assets.webmethods import discover_packages
-
-        local_assets.extend(discover_packages(Path(local_packages).expanduser().resolve()))
+        local_assets.append(iter_packages(Path(local_packages).expanduser().resolve()))
     if local_properties:
-        from src.models.assets.webmethods import discover_properties
+        local_assets.append(iter_properties(Path(local_properties).expanduser().resolve()))
 
-        local_assets.extend(discover_properties(Path(local_properties).expanduser().resolve()))
-
-    head_assets = flatten_assets(local_assets)
+    head_assets = collect_assets(iter_flattened(chain(*local_assets)), memory_cap_mb)
     logger.info(f"Total head assets for comparison: {len(head_assets)}")
 
     # 3. Compare & Report
-    comparator = CodeComparator()
-    result = comparator.compare_assets(repo_assets, head_assets)
+    comparator = CodeComparator(move_threshold=move_threshold, report_dir=Path(report_dir))
+    result = compare_collected(comparator, repo_assets, head_assets)
 
     # Commits are relative to repo branches, not applicable here between repo and local
     info = {
@@ -123,12 +167,103 @@ def run_branch_vs_local(
     print_summary(result, report_file)
 
 
+def parse_source_spec(spec: str) -> tuple[str, str]:
+    """Split a LABEL=REF source spec; a bare REF is its own label."""
+    label, sep, ref = spec.partition("=")
+    return (label, ref) if sep else (spec, spec)
+
+
+def local_source(ref: str) -> Path | None:
+    """Return the local folder or archive a source REF names, or None for a branch.
+
+    A bare REF is only read as a folder when it is spelled like a path (absolute, or
+    starting with ./, ../ or ~), so a branch that happens to share its name with a
+    directory in the working directory is still checked out as a branch.
+    """
+    path = Path(ref).expanduser()
+    if is_archive(path):
+        return path
+    if ref.startswith(("/", "./", "../", "~")) or path.is_absolute():
+        return path if path.is_dir() else None
+    if path.is_dir():
+        logger.warning(
+            f"{ref} is also a local folder; using the branch (use ./{ref} for the folder)"
+        )
+    return None
+
+
+def run_multi_way(
+    repo_url: str | None,
+    source_specs: list[str],
+    workdir: str,
+    report_dir: str = "app/reports",
+):
+    sources = [parse_source_spec(spec) for spec in source_specs]
+    labels = [label for label, _ in sources]
+    duplicates = sorted({label for label in labels if labels.count(label) > 1})
+    if duplicates:
+        logger.error(f"Source labels must be unique, got duplicates: {', '.join(duplicates)}")
+        return
+    repo = None
+    repo_name = "local"
+    if repo_url:
+        repo_name = repo_url.split("/")[-1].replace(".git", "")
+        repo = GitRepo(remote_url=repo_url, local_path=Path(workdir) / repo_name)
+        if not repo.clone_or_pull():
+            logger.error("Failed to prepare repository.")
+            return
+
+    # 1. Scan every source exactly once, folding it straight into the matrix
+    matrix = DriftMatrix(sources=labels)
+    details = {}
+    for label, ref in sources:
+        folder = local_source(ref)
+        if folder is not None:
+            logger.info(f"Treating {ref} as a local path for {label}: {folder}")
+            matrix.add_source(label, iter_assets(folder.resolve()))
+            kind = "archive" if is_archive(folder) else "folder"
+            details[label] = f"local {kind} <b>{folder}</b>"
+            continue
+        if repo is None:
+            logger.error(
+                f"{ref} is not a local path (use ./{ref} for a folder) and no repository was given."
+            )
+            return
+        if not repo.checkout(ref):
+            logger.error(f"Failed to checkout {label}: {ref}")
+            return
+        logger.info(f"Treating {ref} as a branch for {label}")
+        matrix.add_source(label, iter_assets(repo.local_path))
+        details[label] = f"branch <b>{ref}</b> on {repo_name}"
+
+    # 2. Report
+    comparator = CodeComparator(report_dir=Path(report_dir))
+    info = {
+        "scenario": f"Multi-way Drift ({len(sources)} sources)",
+        "repo_url": repo_url,
+        "repo_name": repo_name,
+        "source_details": details,
+    }
+    report_file = comparator.generate_drift_report(matrix, info)
+
+    statuses = [matrix.status(asset_id) for asset_id in matrix.rows]
+    logger.info("=" * 40)
+    logger.info("Drift Analysis Complete!")
+    logger.info(f"Sources: {', '.join(matrix.sources)}")
+    logger.info(f"In Sync: {statuses.count('In Sync')}")
+    logger.info(f"Missing in Some: {statuses.count('Partial')}")
+    logger.info(f"Drifted: {statuses.count('Drift')}")
+    logger.info(f"Report: {report_file}")
+    logger.info("=" * 40)
+
+
 def print_summary(result, report_file):
     logger.info("=" * 40)
     logger.info("Comparison Complete!")
     logger.info(f"Added: {len(result.added)}")
     logger.info(f"Removed: {len(result.removed)}")
     logger.info(f"Modified: {len(result.modified)}")
+    logger.info(f"Moved/Renamed: {len(result.moved)}")
     logger.info(f"Report: {report_file}")
     logger.info("=" * 40)
 
@@ -138,15 +273,40 @@ def main():
     parser.add_argument(
         "--scenario",
         type=int,
-        choices=[1, 2],
-        help="1: Branch vs Branch, 2: Branch vs Local",
+        choices=[1, 2, 3],
+        help="1: Branch vs Branch, 2: Branch vs Local, 3: Multi-way Drift",
     )
     parser.add_argument("--repo", help="Git Repository URL")
     parser.add_argument("--base", help="Base/Repo branch")
     parser.add_argument("--head", help="Head branch (Scenario 1)")
-    parser.add_argument("--local-pkgs", help="Local Packages folder (Scenario 2)")
-    parser.add_argument("--local-props", help="Local Properties folder (Scenario 2)")
+    parser.add_argument(
+        "--local-pkgs", help="Local Packages folder or .zip/.tar.gz export (Scenario 2)"
+    )
+    parser.add_argument(
+        "--local-props", help="Local Properties folder or .zip/.tar.gz export (Scenario 2)"
+    )
+    parser.add_argument(
+        "--sources",
+        nargs="+",
+        help="LABEL=BRANCH or LABEL=FOLDER entries to compare side by side (Scenario 3)",
+    )
     parser.add_argument("--workdir", default="./tmp/repos", help="Working directory")
+    parser.add_argument(
+        "--move-threshold",
+        type=float,
+        default=0.8,
+        help="Minimum similarity (0-1) to report an asset as Moved/Renamed; >1 disables",
+    )
+    parser.add_argument(
+        "--report-dir",
+        default=os.getenv("REPORT_DIR", "app/reports"),
+        help="Directory for HTML reports",
+    )
+    parser.add_argument(
+        "--memory-cap-mb",
+        type=int,
+        help="Low-memory mode: spill asset lists to disk beyond this many MB (Scenarios 1-2)",
+    )
 
     args = parser.parse_args()
 
@@ -155,14 +315,33 @@ def main():
         print("\nSelect Scenario:")
         print("1. Branch vs Branch (Remote Repo)")
         print("2. Branch in Repo vs Local Folder")
-        s_input = input("\nEnter choice [1-2]: ").strip()
-        scenario = int(s_input) if s_input in ["1", "2"] else 1
+        print("3. Multi-way Drift (Branches and/or Local Folders)")
+        s_input = input("\nEnter choice [1-3]: ").strip()
+        scenario = int(s_input) if s_input in ["1", "2", "3"] else 1
 
     if scenario == 1:
         repo = args.repo or get_input("Git Repository URL")
         base = args.base or get_input("Base branch", "main")
         head = args.head or get_input("Head branch")
-        run_branch_vs_branch(repo, base, head, args.workdir)
+        run_branch_vs_branch(
+            repo,
+            base,
+            head,
+            args.workdir,
+            args.move_threshold,
+            args.memory_cap_mb,
+            args.report_dir,
+        )
+    elif scenario == 3:
+        specs = args.sources or get_input("Sources (e.g. DV=develop IT=release PD=master)").split()
+        if len(specs) < 2:
+            logger.error("At least two sources are required for a drift comparison.")
+            sys.exit(1)
+        repo = args.repo
+        refs = [parse_source_spec(s)[1] for s in specs]
+        if not repo and not all(local_source(ref) is not None for ref in refs):
+            repo = get_input("Git Repository URL")
+        run_multi_way(repo, specs, args.workdir, args.report_dir)
     else:
         repo = args.repo or get_input("Git Repository URL")
         branch = args.base or get_input("Repo branch", "main")
@@ -172,8 +351,8 @@ def main():
 
         if not pkgs and not props:
             print("\nProvide at least one local folder path:")
-            pkgs = input("Local Packages folder [skip]: ").strip() or None
-            props = input("Local Properties folder [skip]: ").strip() or None
+            pkgs = input("Local Packages folder or archive [skip]: ").strip() or None
+            props = input("Local Properties folder or archive [skip]: ").strip() or None
 
             if not pkgs and not props:
                 logger.error(
@@ -181,7 +360,16 @@ def main():
                 )
                 sys.exit(1)
 
-        run_branch_vs_local(repo, branch, pkgs, props, args.workdir)
+        run_branch_vs_local(
+            repo,
+            branch,
+            pkgs,
+            props,
+            args.workdir,
+            args.move_threshold,
+            args.memory_cap_mb,
+            args.report_dir,
+        )
 
 
 if __name__ == "__main__":
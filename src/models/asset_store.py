@@ -0,0 +1,112 @@
+import os
+import sqlite3
+import tempfile
+import weakref
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+from src.models.assets.webmethods import FlowService, Package, Properties
+from src.models.base import AssetBase
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+ASSET_TYPES: dict[str, type[AssetBase]] = {
+    "package": Package,
+    "flow_service": FlowService,
+    "properties": Properties,
+}
+
+# Rough per-record bookkeeping cost on top of the serialized JSON
+RECORD_OVERHEAD = 200
+
+
+class AssetStore:
+    """Memory-bounded collection of flat asset records, iterated in asset_id order.
+
+    The memory_cap is split evenly: records are buffered in memory until half of it is
+    used, then spilled to a temporary SQLite table keyed by asset_id, which keeps them
+    sorted on disk and whose page cache gets the other half. Packages are stored without
+    their services, which are expected to be added as separate records.
+    """
+
+    def __init__(self, memory_cap: int, spill_dir: Path | None = None):
+        self.memory_cap = memory_cap
+        self.buffer_cap = memory_cap // 2
+        self.cache_cap = memory_cap - self.buffer_cap
+        self.spill_dir = spill_dir
+        self._buffer: dict[str, tuple[str, str]] = {}
+        self._buffer_size = 0
+        self._db: sqlite3.Connection | None = None
+        self._finalizer: weakref.finalize | None = None
+
+    def add(self, asset: AssetBase) -> None:
+        # Like the dict in compare_assets, a later record with the same asset_id wins
+        data = asset.model_dump_json(exclude={"services"})
+        self._buffer[asset.asset_id] = (asset.asset_type, data)
+        self._buffer_size += len(data) + RECORD_OVERHEAD
+        if self._buffer_size > self.buffer_cap:
+            self._spill()
+
+    def extend(self, assets: Iterable[AssetBase]) -> "AssetStore":
+        for asset in assets:
+            self.add(asset)
+        return self
+
+    def _spill(self) -> None:
+        if self._db is None:
+            fd, db_path = tempfile.mkstemp(
+                prefix="wbm_assets_", suffix=".sqlite", dir=self.spill_dir
+            )
+            os.close(fd)
+            self._db = sqlite3.connect(db_path)
+            # The spill file is removed on close() or, at the latest, when the store is collected
+            self._finalizer = weakref.finalize(self, _remove_spill, self._db, db_path)
+            # SQLite's page cache gets its half of the cap; durability is irrelevant here
+            self._db.execute(f"PRAGMA cache_size = -{max(self.cache_cap // 1024, 1)}")
+            self._db.execute("PRAGMA journal_mode = OFF")
+            self._db.execute("PRAGMA synchronous = OFF")
+            self._db.execute(
+                "CREATE TABLE assets (asset_id TEXT PRIMARY KEY, asset_type TEXT, data TEXT)"
+                " WITHOUT ROWID"
+            )
+            logger.info(f"Asset list exceeded memory cap, spilling to {db_path}")
+        self._db.executemany(
+            "INSERT OR REPLACE INTO assets VALUES (?, ?, ?)",
+            ((asset_id, t, d) for asset_id, (t, d) in self._buffer.items()),
+        )
+        self._db.commit()
+        self._buffer.clear()
+        self._buffer_size = 0
+
+    def __len__(self) -> int:
+        if self._db is None:
+            return len(self._buffer)
+        self._spill()
+        return self._db.execute("SELECT COUNT(*) FROM assets").fetchone()[0]
+
+    def __iter__(self) -> Iterator[AssetBase]:
+        if self._db is None:
+            rows = ((t, d) for _, (t, d) in sorted(self._buffer.items()))
+        else:
+            self._spill()
+            rows = self._db.execute("SELECT asset_type, data FROM assets ORDER BY asset_id")
+        for asset_type, data in rows:
+            yield ASSET_TYPES.get(asset_type, AssetBase).model_validate_json(data)
+
+    def close(self) -> None:
+        if self._finalizer is not None:
+            self._finalizer()
+            self._db = None
+        self._buffer.clear()
+
+    def __enter__(self) -> "AssetStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _remove_spill(db: sqlite3.Connection, db_path: str) -> None:
+    db.close()
+    os.unlink(db_path)
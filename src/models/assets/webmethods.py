@@ -1,7 +1,9 @@
 import hashlib
+from collections.abc import Iterable, Iterator
 from pathlib import Path
 
 from src.models.base import AssetBase
+from src.models.sources import AssetSource, FolderSource, hash_stream, open_source, subtree
 from src.utils.logger import setup_logger
 
 logger = setup_logger(__name__)
@@ -28,105 +30,151 @@ class Properties(AssetBase):
     env_prefix: str | None = None
 
 
+PACKAGES_PREFIX = ("assets", "IS", "Packages")
+PROPERTIES_PREFIX = ("assets", "IS", "Properties")
+ENV_PREFIXES = ["DV_", "IT_", "UA_", "PD_"]
+
+
+def combine_digests(entries: list[tuple[tuple[str, ...], str]]) -> str:
+    """Combine sorted (path parts, file digest) entries into one directory digest.
+
+    Only file names and contents contribute, so a moved directory keeps its digest.
+    """
+    sha256_hash = hashlib.sha256()
+    for parts, digest in entries:
+        sha256_hash.update(parts[-1].encode())
+        sha256_hash.update(bytes.fromhex(digest))
+    return sha256_hash.hexdigest()
+
+
 def calculate_sha256(path: Path) -> str:
     """Calculate SHA256 of a file or directory content."""
-    sha256_hash = hashlib.sha256()
     if path.is_file():
         with open(path, "rb") as f:
-            for byte_block in iter(lambda: f.read(4096), b""):
-                sha256_hash.update(byte_block)
-    elif path.is_dir():
-        # For directories (like services), we hash all relevant files
-        for file in sorted(path.rglob("*")):
-            if file.is_file() and not file.name.startswith("."):
-                sha256_hash.update(file.name.encode())
-                with open(file, "rb") as f:
-                    for byte_block in iter(lambda: f.read(4096), b""):
-                        sha256_hash.update(byte_block)
-    return sha256_hash.hexdigest()
+            return hash_stream(f)
+    # For directories (like services), we hash all relevant files
+    source = FolderSource(path)
+    files = [f for f in source.list_files() if not f[-1].startswith(".")]
+    digests = source.hash_files(files)
+    return combine_digests([(parts, digests[parts]) for parts in files])
 
 
-def discover_packages(root_path: Path) -> list[Package]:
-    """Discover IS Packages and their services."""
-    discovered = []
+def iter_packages(root_path: Path | AssetSource) -> Iterator[Package]:
+    """Discover IS Packages and their services one package at a time."""
+    count = 0
+    source = open_source(root_path)
 
     # Check if root_path itself is a Packages dir or contains assets/IS/Packages
-    packages_dir = root_path
-    if (root_path / "assets" / "IS" / "Packages").exists():
-        packages_dir = root_path / "assets" / "IS" / "Packages"
-
-    if not packages_dir.exists() or not packages_dir.is_dir():
-        return discovered
-
-    for pkg_dir in sorted(packages_dir.iterdir()):
-        if pkg_dir.is_dir() and (pkg_dir / "manifest.v3").exists():
-            pkg = Package(
-                name=pkg_dir.name,
-                f_path=str(pkg_dir),
-                sha256=calculate_sha256(pkg_dir),
-                services=[],
+    packages_prefix = PACKAGES_PREFIX if source.is_dir(PACKAGES_PREFIX) else ()
+
+    if not packages_prefix and ("manifest.v3",) in source.list_files(recursive=False):
+        # An exported single package (e.g. an IS package zip) with its manifest at the root
+        packages = [(source.name, ())]
+    else:
+        packages = []
+        for name in source.list_dirs(packages_prefix):
+            pkg_prefix = packages_prefix + (name,)
+            if pkg_prefix + ("manifest.v3",) in source.list_files(pkg_prefix, recursive=False):
+                packages.append((name, pkg_prefix))
+
+    for pkg_name, pkg_prefix in packages:
+        files = _visible_files(source, pkg_prefix)
+        pkg_digests = source.hash_files(files)
+        pkg = Package(
+            name=pkg_name,
+            f_path=source.location(pkg_prefix),
+            sha256=combine_digests([(f, pkg_digests[f]) for f in files]),
+            services=[],
+        )
+
+        # Discover services
+        services_prefix = pkg_prefix + ("ns",)
+        for svc_file in subtree(files, services_prefix):
+            if svc_file[-1] != "flow.xml":
+                continue
+            svc_prefix = svc_file[:-1]
+            parts = svc_prefix[len(services_prefix) :]
+            if not parts:
+                continue
+            if len(parts) > 1:
+                svc_name = f"{'.'.join(parts[:-1])}:{parts[-1]}"
+            else:
+                svc_name = parts[0]
+            svc_entries = [(f, pkg_digests[f]) for f in subtree(files, svc_prefix)]
+            svc = FlowService(
+                name=svc_name,
+                package_name=pkg.name,
+                f_path=source.location(svc_prefix),
+                sha256=combine_digests(svc_entries),
             )
+            pkg.services.append(svc)
 
-            # Discover services
-            services_root = pkg_dir / "ns"
-            if services_root.exists():
-                for svc_file in services_root.rglob("flow.xml"):
-                    svc_dir = svc_file.parent
-                    parts = svc_dir.relative_to(services_root).parts
-                    if len(parts) > 1:
-                        svc_name = f"{'.'.join(parts[:-1])}:{parts[-1]}"
-                    else:
-                        svc_name = parts[0]
-                    svc = FlowService(
-                        name=svc_name,
-                        package_name=pkg.name,
-                        f_path=str(svc_dir),
-                        sha256=calculate_sha256(svc_dir),
-                    )
-                    pkg.services.append(svc)
-
-            discovered.append(pkg)
-
-    logger.info(f"Discovered {len(discovered)} packages")
-    return discovered
-
-
-def discover_properties(root_path: Path) -> list[Properties]:
-    """Discover IS Property files."""
-    discovered = []
-
-    properties_dir = root_path
-    if (root_path / "assets" / "IS" / "Properties").exists():
-        properties_dir = root_path / "assets" / "IS" / "Properties"
-
-    if not properties_dir.exists() or not properties_dir.is_dir():
-        return discovered
-
-    prefixes = ["DV_", "IT_", "UA_", "PD_"]
-    for f in sorted(properties_dir.iterdir()):
-        if f.is_file() and any(f.name.startswith(p) for p in prefixes):
-            env = f.name.split("_")[0]
-            discovered.append(
-                Properties(name=f.name, f_path=str(f), sha256=calculate_sha256(f), env_prefix=env)
-            )
+        count += 1
+        yield pkg
+
+    logger.info(f"Discovered {count} packages")
+
+
+def discover_packages(root_path: Path | AssetSource) -> list[Package]:
+    """Discover IS Packages and their services from a folder or archive."""
+    return list(iter_packages(root_path))
+
+
+def _visible_files(source: AssetSource, prefix: tuple[str, ...]) -> list[tuple]:
+    # Hidden files never contribute to digests
+    return [f for f in source.list_files(prefix) if not f[-1].startswith(".")]
 
-    logger.info(f"Discovered {len(discovered)} properties")
-    return discovered
 
+def iter_properties(root_path: Path | AssetSource) -> Iterator[Properties]:
+    """Discover IS Property files from a folder or archive."""
+    count = 0
+    source = open_source(root_path)
 
-def discover_all_assets(root_path: Path) -> list[AssetBase]:
+    properties_prefix = PROPERTIES_PREFIX if source.is_dir(PROPERTIES_PREFIX) else ()
+    files = [
+        f
+        for f in source.list_files(properties_prefix, recursive=False)
+        if any(f[-1].startswith(p) for p in ENV_PREFIXES)
+    ]
+    digests = source.hash_files(files)
+
+    for f in files:
+        env = f[-1].split("_")[0]
+        count += 1
+        yield Properties(name=f[-1], f_path=source.location(f), sha256=digests[f], env_prefix=env)
+
+    logger.info(f"Discovered {count} properties")
+
+
+def discover_properties(root_path: Path | AssetSource) -> list[Properties]:
+    """Discover IS Property files from a folder or archive."""
+    return list(iter_properties(root_path))
+
+
+def iter_assets(root_path: Path | AssetSource) -> Iterator[AssetBase]:
+    """Stream all webMethods assets, already flattened, without building a full list."""
+    source = open_source(root_path)
+    yield from iter_flattened(iter_packages(source))
+    yield from iter_properties(source)
+
+
+def discover_all_assets(root_path: Path | AssetSource) -> list[AssetBase]:
     """Discover all webMethods assets (Packages + Properties)."""
+    source = open_source(root_path)
     assets = []
-    assets.extend(discover_packages(root_path))
-    assets.extend(discover_properties(root_path))
+    assets.extend(discover_packages(source))
+    assets.extend(discover_properties(source))
     return assets
 
 
-def flatten_assets(assets: list[AssetBase]) -> list[AssetBase]:
-    """Flatten hierarchical asset list."""
-    flat = []
+def iter_flattened(assets: Iterable[AssetBase]) -> Iterator[AssetBase]:
+    """Lazily flatten a hierarchical asset stream."""
     for asset in assets:
-        flat.append(asset)
+        yield asset
         if isinstance(asset, Package):
-            flat.extend(asset.services)
-    return flat
+            yield from asset.services
+
+
+def flatten_assets(assets: list[AssetBase]) -> list[AssetBase]:
+    """Flatten hierarchical asset list."""
+    return list(iter_flattened(assets))
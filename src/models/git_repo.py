@@ -62,6 +62,10 @@ class GitRepo(BaseAsset):
             logger.error(f"Checkout failed: {e.stderr}")
             return False
 
+    def blob_reader(self, ref: str) -> "GitBlobReader":
+        """Open a reader for many files at ref, served by one `git cat-file --batch` process."""
+        return GitBlobReader(self.local_path, ref)
+
     def get_commit_log(self, base_ref: str, head_ref: str) -> list[dict[str, Any]]:
         """Get commits unique to head_ref."""
         try:
@@ -97,3 +101,48 @@ class GitRepo(BaseAsset):
         except Exception as e:
             logger.error(f"Error getting commit log: {e}")
             return []
+
+
+class GitBlobReader:
+    """Reads files at a fixed ref through a single long-running `git cat-file --batch`.
+
+    Spawning `git show` per file dominates move detection on large repos; the batch
+    process answers each request with a "<sha> blob <size>" header followed by the content.
+    """
+
+    def __init__(self, local_path: Path, ref: str):
+        self.local_path = local_path
+        self.ref = ref
+        self._proc = subprocess.Popen(
+            ["git", "cat-file", "--batch"],
+            cwd=local_path,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+
+    def read(self, location: str) -> bytes:
+        """Read a checkout location as it is at ref."""
+        rel_path = Path(location).resolve().relative_to(self.local_path.resolve()).as_posix()
+        self._proc.stdin.write(f"{self.ref}:{rel_path}\n".encode())
+        self._proc.stdin.flush()
+        header = self._proc.stdout.readline().split()
+        # Unknown names answer "<name> missing" (or "ambiguous") with no content following
+        if len(header) != 3 or not header[2].isdigit():
+            raise FileNotFoundError(f"{self.ref}:{rel_path}")
+        size = int(header[2])
+        data = self._proc.stdout.read(size + 1)[:size]
+        if header[1] != b"blob":
+            raise FileNotFoundError(f"{self.ref}:{rel_path}")
+        return data
+
+    def close(self) -> None:
+        if self._proc.poll() is None:
+            self._proc.stdin.close()
+            self._proc.wait()
+            self._proc.stdout.close()
+
+    def __enter__(self) -> "GitBlobReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
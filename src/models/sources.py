@@ -0,0 +1,286 @@
+import hashlib
+import io
+import os
+import tarfile
+import threading
+import weakref
+import zipfile
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import IO, TypeVar
+
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+T = TypeVar("T")
+
+# Separates an archive path from the entry path inside it, e.g. "pkgs.zip!/ns/flow.xml"
+ARCHIVE_SEP = "!/"
+ARCHIVE_SUFFIXES = (".zip", ".tar.gz", ".tgz", ".tar")
+
+MAX_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+
+def hash_stream(f: IO[bytes]) -> str:
+    """Calculate SHA256 of a binary stream."""
+    sha256_hash = hashlib.sha256()
+    for byte_block in iter(lambda: f.read(65536), b""):
+        sha256_hash.update(byte_block)
+    return sha256_hash.hexdigest()
+
+
+class AssetSource(ABC):
+    """A tree of files that assets can be discovered from.
+
+    Entries are addressed by their path parts relative to the source root, so the same
+    discovery and hashing logic works for folders and archives alike.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    @property
+    def name(self) -> str:
+        return self.root.name
+
+    @abstractmethod
+    def list_files(self, prefix: tuple[str, ...] = (), recursive: bool = True) -> list[tuple]:
+        """Return the parts of all regular files under prefix, sorted."""
+
+    @abstractmethod
+    def list_dirs(self, prefix: tuple[str, ...] = ()) -> list[str]:
+        """Return the sorted names of directories directly under prefix."""
+
+    @abstractmethod
+    def map_files(self, files: list[tuple], fn: Callable[[IO[bytes]], T]) -> dict[tuple, T]:
+        """Apply fn to an open binary stream of each file, in parallel where possible."""
+
+    @abstractmethod
+    def location(self, parts: tuple[str, ...]) -> str:
+        """Human readable location of an entry, used as an asset's f_path."""
+
+    def hash_files(self, files: list[tuple]) -> dict[tuple, str]:
+        """Return the SHA256 of each file."""
+        return self.map_files(files, hash_stream)
+
+    def is_dir(self, parts: tuple[str, ...]) -> bool:
+        return bool(self.list_files(parts))
+
+    def close(self) -> None:  # noqa: B027 - optional hook, most sources hold no handles
+        """Release any handles held by the source."""
+
+
+class FolderSource(AssetSource):
+    """Files on the local filesystem."""
+
+    def list_files(self, prefix: tuple[str, ...] = (), recursive: bool = True) -> list[tuple]:
+        base = self.root.joinpath(*prefix)
+        if not base.is_dir():
+            return []
+        found = base.rglob("*") if recursive else base.iterdir()
+        return sorted(f.relative_to(self.root).parts for f in found if f.is_file())
+
+    def list_dirs(self, prefix: tuple[str, ...] = ()) -> list[str]:
+        base = self.root.joinpath(*prefix)
+        if not base.is_dir():
+            return []
+        return sorted(d.name for d in base.iterdir() if d.is_dir())
+
+    def is_dir(self, parts: tuple[str, ...]) -> bool:
+        return self.root.joinpath(*parts).is_dir()
+
+    def map_files(self, files: list[tuple], fn: Callable[[IO[bytes]], T]) -> dict[tuple, T]:
+        def apply(parts: tuple) -> T:
+            with open(self.root.joinpath(*parts), "rb") as f:
+                return fn(f)
+
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            return dict(zip(files, pool.map(apply, files), strict=True))
+
+    def location(self, parts: tuple[str, ...]) -> str:
+        return str(self.root.joinpath(*parts))
+
+
+class ArchiveSource(AssetSource):
+    """Base for sources read straight from an archive without extracting it."""
+
+    def __init__(self, root: Path):
+        super().__init__(root)
+        self._entries: list[tuple] | None = None
+
+    @property
+    def name(self) -> str:
+        name = self.root.name
+        for suffix in ARCHIVE_SUFFIXES:
+            if name.lower().endswith(suffix):
+                return name[: -len(suffix)]
+        return name
+
+    @abstractmethod
+    def _read_entries(self) -> list[tuple]:
+        """List the parts of every regular file in the archive."""
+
+    def _index(self) -> list[tuple]:
+        """Read the archive directory once and keep its sorted entry list."""
+        if self._entries is None:
+            self._entries = sorted(self._read_entries())
+            logger.info(f"Indexed {len(self._entries)} files in {self.root}")
+        return self._entries
+
+    def list_files(self, prefix: tuple[str, ...] = (), recursive: bool = True) -> list[tuple]:
+        depth = len(prefix) + 1
+        return [
+            e
+            for e in subtree(self._index(), prefix)
+            if len(e) >= depth and (recursive or len(e) == depth)
+        ]
+
+    def list_dirs(self, prefix: tuple[str, ...] = ()) -> list[str]:
+        depth = len(prefix) + 1
+        return sorted({e[depth - 1] for e in subtree(self._index(), prefix) if len(e) > depth})
+
+    def location(self, parts: tuple[str, ...]) -> str:
+        return f"{self.root}{ARCHIVE_SEP}{'/'.join(parts)}"
+
+
+class ZipSource(ArchiveSource):
+    """A .zip export, read in parallel through one shared handle.
+
+    ZipFile serializes access to the underlying file internally and decompresses in the
+    calling thread, so a single handle (and a single parsed central directory) serves all
+    workers.
+    """
+
+    def __init__(self, root: Path):
+        super().__init__(root)
+        self._infos: dict[tuple, zipfile.ZipInfo] = {}
+        self._zf: zipfile.ZipFile | None = None
+        self._pool: ThreadPoolExecutor | None = None
+        self._finalizer: weakref.finalize | None = None
+
+    def _read_entries(self) -> list[tuple]:
+        self._zf = zipfile.ZipFile(self.root)
+        self._pool = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+        self._finalizer = weakref.finalize(self, _close_zip, self._pool, self._zf)
+        self._infos = {_split(i.filename): i for i in self._zf.infolist() if not i.is_dir()}
+        return list(self._infos)
+
+    def map_files(self, files: list[tuple], fn: Callable[[IO[bytes]], T]) -> dict[tuple, T]:
+        self._index()
+
+        def apply(parts: tuple) -> T:
+            with self._zf.open(self._infos[parts]) as f:
+                return fn(f)
+
+        return dict(zip(files, self._pool.map(apply, files), strict=True))
+
+    def close(self) -> None:
+        if self._finalizer is not None:
+            self._finalizer()
+            self._zf = self._pool = None
+            self._entries = None
+
+
+def _close_zip(pool: ThreadPoolExecutor, zf: zipfile.ZipFile) -> None:
+    pool.shutdown(wait=True)
+    zf.close()
+
+
+class TarSource(ArchiveSource):
+    """A .tar/.tar.gz export.
+
+    Compressed tar streams cannot be read in parallel, so indexing makes one forward pass
+    that hashes every file as it streams past. Only the per-file digest and offset are
+    kept, but for the whole archive: unlike folders and zips, tar sources are not bounded
+    by the low-memory mode.
+    """
+
+    def __init__(self, root: Path):
+        super().__init__(root)
+        # parts -> (sha256, data offset, size)
+        self._files: dict[tuple, tuple[str, int, int]] = {}
+        self._tf: tarfile.TarFile | None = None
+        self._tf_lock = threading.Lock()
+        self._finalizer: weakref.finalize | None = None
+
+    def _read_entries(self) -> list[tuple]:
+        with tarfile.open(self.root, "r:*") as tf:
+            for member in tf:
+                if member.isfile():
+                    with tf.extractfile(member) as f:
+                        digest = hash_stream(f)
+                    self._files[_split(member.name)] = (digest, member.offset_data, member.size)
+                # Iterating would otherwise keep every TarInfo alive
+                tf.members = []
+        return list(self._files)
+
+    def hash_files(self, files: list[tuple]) -> dict[tuple, str]:
+        self._index()
+        return {parts: self._files[parts][0] for parts in files}
+
+    def map_files(self, files: list[tuple], fn: Callable[[IO[bytes]], T]) -> dict[tuple, T]:
+        self._index()
+        results = {}
+        with self._tf_lock:
+            if self._tf is None:
+                self._tf = tarfile.open(self.root, "r:*")
+                self._finalizer = weakref.finalize(self, self._tf.close)
+            # Reading in offset order keeps the decompressed stream moving forward
+            for parts in sorted(files, key=lambda p: self._files[p][1]):
+                _, offset, size = self._files[parts]
+                self._tf.fileobj.seek(offset)
+                results[parts] = fn(io.BytesIO(self._tf.fileobj.read(size)))
+        return results
+
+    def close(self) -> None:
+        if self._finalizer is not None:
+            self._finalizer()
+            self._tf = None
+
+
+def subtree(files: list[tuple], prefix: tuple[str, ...]) -> list[tuple]:
+    """Slice a sorted list of path parts down to entries under prefix."""
+    lo = bisect_left(files, prefix)
+    hi = bisect_left(files, prefix + (chr(0x10FFFF),))
+    return files[lo:hi]
+
+
+def _split(name: str) -> tuple[str, ...]:
+    return tuple(p for p in name.split("/") if p and p != ".")
+
+
+def is_archive(path: Path) -> bool:
+    """True if path is an archive file that can be used as an asset source."""
+    return path.is_file() and path.name.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def open_source(path: Path | AssetSource) -> AssetSource:
+    """Pick the source backend for a folder or archive path."""
+    if isinstance(path, AssetSource):
+        return path
+    if is_archive(path):
+        return ZipSource(path) if path.name.lower().endswith(".zip") else TarSource(path)
+    return FolderSource(path)
+
+
+@lru_cache(maxsize=8)
+def _archive_source(archive: str) -> AssetSource:
+    # Keeps the archive index (and zip handles) across reads of many entries
+    return open_source(Path(archive))
+
+
+def read_location(location: str) -> bytes:
+    """Read a single file by its asset location, looking inside archives if needed."""
+    archive, sep, inner = location.partition(ARCHIVE_SEP)
+    if not sep:
+        return Path(location).read_bytes()
+    source = _archive_source(archive)
+    parts = _split(inner)
+    if parts not in source.list_files(parts[:-1], recursive=False):
+        raise FileNotFoundError(location)
+    return source.map_files([parts], lambda f: f.read())[parts]
@@ -1,34 +1,61 @@
+import atexit
 import logging
+import os
+import queue
 import sys
+import threading
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_listener: QueueListener | None = None
+_listener_lock = threading.Lock()
+
+
+def _start_listener() -> None:
+    """Start the single background thread that writes log records to console and file."""
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            return
+
+        # Create formatters
+        formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+        # Console Handler
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(formatter)
+
+        # File Handler, unique per process so parallel runs never share a file
+        log_dir = Path(os.getenv("LOG_DIR", "app/logs"))
+        log_dir.mkdir(parents=True, exist_ok=True)
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        log_file = log_dir / f"ibm_wbm_code_compare_{timestamp}_{os.getpid()}.log"
+
+        file_handler = logging.FileHandler(log_file)
+        file_handler.setFormatter(formatter)
+
+        _listener = QueueListener(_log_queue, console_handler, file_handler)
+        _listener.start()
+        # Drain the queue before the interpreter exits
+        atexit.register(_listener.stop)
+
 
 def setup_logger(name: str = "ibm_wbm_code_compare") -> logging.Logger:
-    """Setup structured logging to console and file."""
+    """Setup structured logging to console and file.
+
+    Loggers only enqueue records; a shared QueueListener thread does the actual I/O, so
+    logging never blocks the discovery and hashing threads.
+    """
     logger = logging.getLogger(name)
     logger.setLevel(logging.INFO)
 
     if logger.handlers:
         return logger
 
-    # Create formatters
-    formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-
-    # Console Handler
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
-
-    # File Handler
-    log_dir = Path("app/logs")
-    log_dir.mkdir(parents=True, exist_ok=True)
-
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    log_file = log_dir / f"ibm_wbm_code_compare_{timestamp}.log"
-
-    file_handler = logging.FileHandler(log_file)
-    file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
+    _start_listener()
+    logger.addHandler(QueueHandler(_log_queue))
 
     return logger